@@ -5,11 +5,12 @@ Streamlit Application
 
 import streamlit as st
 import pandas as pd
+import hmac
+import time
 from datetime import datetime
 from database import DatabaseManager
-from financial_analyzer import FinancialAnalyzer
+from financial_analyzer import FinancialAnalyzer, RETURN_KEYS, CAGR_KEYS, RETURN_PERIOD_LABELS
 from portfolio import PortfolioManager
-import time
 
 # Page configuration
 st.set_page_config(
@@ -19,15 +20,127 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize managers
+# Initialize managers lazily, so each page only builds what it uses
+@st.cache_resource
+def get_db():
+    return DatabaseManager()
+
 @st.cache_resource
-def get_managers():
-    return DatabaseManager(), FinancialAnalyzer(), PortfolioManager()
+def get_analyzer():
+    return FinancialAnalyzer(get_db())
+
+@st.cache_resource
+def get_portfolio_manager():
+    return PortfolioManager()
+
+# How long a portfolio analysis is reused before prices are refetched
+ANALYSIS_TTL_SECONDS = 300
+
+# Login credentials
+CLIENT_PASSWORD = "UnoCap"
+ADMIN_USERNAME = "Sarbo"
+ADMIN_PASSWORD = "Sarbo"
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_investments(user_id: int) -> pd.DataFrame:
+    """Load a user's investments, cached across reruns"""
+    return get_db().get_user_investments(user_id)
+
+class _PartialAnalysis(Exception):
+    """Raised from a cached analysis that skipped instruments, so it isn't cached"""
+    
+    def __init__(self, portfolio_analysis: dict):
+        super().__init__("Portfolio analysis skipped instruments")
+        self.portfolio_analysis = portfolio_analysis
+
+def _analyzable_count(investments_df: pd.DataFrame) -> int:
+    """Count investments with an identifier, i.e. the ones analyze_portfolio should return"""
+    is_mf = investments_df['instrument_type'] == 'Mutual Fund'
+    return int(investments_df['scheme_code'].where(is_mf, investments_df['symbol']).notna().sum())
+
+@st.cache_data(ttl=ANALYSIS_TTL_SECONDS, show_spinner=False)
+def _analyze(fingerprint: tuple, _investments_df: pd.DataFrame) -> dict:
+    """Analyze a portfolio, cached on its fingerprint instead of hashing the DataFrame"""
+    portfolio_analysis = get_analyzer().analyze_portfolio(_investments_df)
+    
+    # A failed fetch drops its instrument but not its invested amount; caching that would
+    # show every viewer a fake loss until the entry expires
+    if portfolio_analysis['num_investments'] < _analyzable_count(_investments_df):
+        raise _PartialAnalysis(portfolio_analysis)
+    return portfolio_analysis
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cached_mf_search(search_term: str) -> list:
+    """Search mutual funds; raises on no results, since a failed request also looks empty"""
+    results = get_analyzer().search_mutual_fund(search_term)
+    if not results:
+        raise LookupError(f"No mutual funds found for {search_term}")
+    return results
+
+def _search_mf(search_term: str) -> list:
+    """Search mutual funds, cached so reruns with the same query skip the API; misses are retried"""
+    try:
+        return _cached_mf_search(search_term)
+    except LookupError:
+        return []
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _count_clients() -> int:
+    """Count registered clients, cached for the admin pager"""
+    return get_db().count_clients()
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _auth(mobile: str):
+    """Look up a client by mobile once the shared password has been checked"""
+    return get_db().authenticate_user(mobile, CLIENT_PASSWORD, 'client')
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _lookup_client(mobile: str):
+    """Find a client by mobile for the admin search, cached across reruns"""
+    return get_db().get_user_by_mobile(mobile)
+
+def _clear_client_cache():
+    """Invalidate cached client lookups after a signup"""
+    _count_clients.clear()
+    _auth.clear()
+    _lookup_client.clear()
+
+def _credentials_match(given: str, expected: str) -> bool:
+    """Constant-time credential comparison"""
+    return hmac.compare_digest(given.encode(), expected.encode())
+
+def _portfolio_fingerprint(investments_df: pd.DataFrame) -> tuple:
+    """Cheap, stable cache key for a portfolio (investment ids + amounts)"""
+    return tuple(sorted(zip(investments_df['investment_id'], investments_df['current_investment'])))
+
+def _portfolio_analysis(fingerprint: tuple, investments_df: pd.DataFrame) -> dict:
+    """Reuse this session's last analysis while the portfolio is unchanged and fresh"""
+    last = st.session_state.get('last_portfolio_analysis')
+    if last and last[0] == fingerprint and time.monotonic() - last[1] < ANALYSIS_TTL_SECONDS:
+        return last[2]
+    
+    try:
+        portfolio_analysis = _analyze(fingerprint, investments_df)
+    except _PartialAnalysis as partial:
+        # Show this run's partial result, but keep it out of the session copy too
+        return partial.portfolio_analysis
+    
+    st.session_state.last_portfolio_analysis = (fingerprint, time.monotonic(), portfolio_analysis)
+    return portfolio_analysis
+
+def _clear_portfolio_cache():
+    """Invalidate cached investments and analyses after a portfolio change"""
+    _load_investments.clear()
+    _analyze.clear()
+
+# Shorter mutual fund queries match too broadly to be useful
+MIN_MF_SEARCH_LENGTH = 3
 
-db, analyzer, portfolio_mgr = get_managers()
+# Rows per page in the admin clients table
+CLIENTS_PAGE_SIZE = 50
 
 # Custom CSS
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -51,7 +164,9 @@ st.markdown("""
         font-weight: bold;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 # Initialize session state
 if 'logged_in' not in st.session_state:
@@ -68,6 +183,150 @@ def logout():
     st.session_state.page = 'login'
     st.rerun()
 
+# ==================== INSTRUMENT DETAILS ====================
+# Tables keep numeric columns; the frontend formats them
+HOLDINGS_COLUMN_CONFIG = {
+    'Invested Amount (₹)': st.column_config.NumberColumn(format="₹%.2f")
+}
+PERIOD_COLUMN_CONFIG = {
+    'Return (%)': st.column_config.NumberColumn(format="%.2f%%"),
+    'CAGR (%)': st.column_config.NumberColumn(format="%.2f%%")
+}
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _period_returns_df(returns_items: tuple) -> pd.DataFrame:
+    """Build the period returns table from an instrument's (key, value) return/CAGR items"""
+    returns = dict(returns_items)
+    periods = [(label, key, cagr_key) for label, key, cagr_key in zip(RETURN_PERIOD_LABELS, RETURN_KEYS, CAGR_KEYS)
+               if key in returns]
+    
+    period_df = pd.DataFrame({
+        'Period': [label for label, _, _ in periods],
+        'Return (%)': [returns[key] for _, key, _ in periods],
+        'CAGR (%)': [returns.get(cagr_key) for _, _, cagr_key in periods]
+    })
+    
+    # CAGR only exists for periods of a year or more
+    if not any(cagr_key in returns for _, _, cagr_key in periods):
+        period_df = period_df.drop(columns='CAGR (%)')
+    
+    return period_df
+
+def _holdings_df(holdings: pd.DataFrame, invested_by_name: dict) -> pd.DataFrame:
+    """Build the holdings summary table from analyzed instruments and their invested amounts"""
+    return pd.DataFrame({
+        'Instrument': holdings['name'],
+        'Type': holdings['instrument_type'],
+        'Invested Amount (₹)': holdings['name'].map(invested_by_name)
+    })
+
+def _render_instrument_details(instrument: dict, invested_by_name: dict, viewer_label: str = "Your"):
+    """Render the detailed metrics for one instrument inside its expander"""
+    
+    # Basic Info Section
+    st.markdown("#### 📋 Instrument Information")
+    metadata = instrument.get('metadata', {})
+    
+    if instrument['instrument_type'] == 'Mutual Fund':
+        info_cols = st.columns(3)
+        with info_cols[0]:
+            st.metric("Scheme Code", metadata.get('scheme_code', 'N/A'))
+        with info_cols[1]:
+            st.metric("Fund House", metadata.get('fund_house', 'N/A'))
+        with info_cols[2]:
+            st.metric("Category", metadata.get('scheme_category', 'N/A'))
+        
+        st.caption(f"**Scheme Type:** {metadata.get('scheme_type', 'N/A')}")
+    else:  # Stock
+        info_cols = st.columns(4)
+        with info_cols[0]:
+            st.metric("Symbol", metadata.get('symbol', 'N/A'))
+        with info_cols[1]:
+            st.metric("Exchange", metadata.get('exchange', 'N/A'))
+        with info_cols[2]:
+            st.metric("Sector", metadata.get('sector', 'N/A'))
+        with info_cols[3]:
+            mkt_cap = metadata.get('marketCap', 'N/A')
+            if isinstance(mkt_cap, (int, float)):
+                st.metric("Market Cap", f"₹{mkt_cap/10000000:,.0f} Cr")
+            else:
+                st.metric("Market Cap", "N/A")
+    
+    st.divider()
+    
+    # Current Price & Investment
+    st.markdown(f"#### 💰 {viewer_label} Investment")
+    returns = instrument.get('returns', {})
+    
+    inv_cols = st.columns(4)
+    with inv_cols[0]:
+        invested = invested_by_name.get(instrument['name'], 0)
+        st.metric(f"{viewer_label} Investment", f"₹{invested:,.2f}")
+    with inv_cols[1]:
+        st.metric("Current NAV/Price", f"₹{returns.get('current_price', 0):.2f}")
+    with inv_cols[2]:
+        st.metric("Latest Date", returns.get('latest_date', 'N/A'))
+    with inv_cols[3]:
+        st.metric("Units (Estimated)", f"{returns.get('units', 0):.2f}")
+    
+    st.divider()
+    
+    # Performance Metrics
+    st.markdown("#### 📈 Performance Returns")
+    st.caption("*Returns are calculated based on historical performance of the instrument*")
+    
+    # Period Returns Table
+    # Key only on the fields the table shows, not per-holding amounts that vary by user and day
+    period_df = _period_returns_df(tuple((key, returns[key]) for key in RETURN_KEYS + CAGR_KEYS if key in returns))
+    
+    if not period_df.empty:
+        st.dataframe(period_df, use_container_width=True, hide_index=True,
+                     column_config=PERIOD_COLUMN_CONFIG)
+    else:
+        st.info("Period returns data not available")
+    
+    st.divider()
+    
+    # Risk Metrics
+    st.markdown("#### ⚠️ Risk Metrics")
+    risk = instrument.get('risk_metrics', {})
+    
+    risk_cols = st.columns(4)
+    with risk_cols[0]:
+        st.metric("Volatility (Annual)", f"{risk.get('volatility', 0):.2f}%")
+    with risk_cols[1]:
+        st.metric("Sharpe Ratio", f"{risk.get('sharpe_ratio', 0):.2f}")
+    with risk_cols[2]:
+        st.metric("Max Drawdown", f"{risk.get('max_drawdown', 0):.2f}%")
+    with risk_cols[3]:
+        st.metric("52-Week High", f"₹{risk.get('max_price', 0):.2f}")
+    
+    st.caption(f"**52-Week Low:** ₹{risk.get('min_price', 0):.2f}")
+    
+    # Risk interpretation
+    volatility = risk.get('volatility', 0)
+    if volatility < 10:
+        risk_level = "🟢 Low Risk"
+    elif volatility < 20:
+        risk_level = "🟡 Moderate Risk"
+    else:
+        risk_level = "🔴 High Risk"
+    
+    st.info(f"**Risk Level:** {risk_level} | **Interpretation:** " + 
+           ("Lower volatility indicates more stable returns" if volatility < 15 else "Higher volatility indicates more fluctuation in returns"))
+    
+    st.markdown("---")
+
+# ==================== CALLBACKS ====================
+def _delete_investment(investment_id: int):
+    """Delete callback; runs before the rerun so every tab renders the updated portfolio"""
+    success, message = get_db().delete_investment(investment_id)
+    if success:
+        _clear_portfolio_cache()
+        st.toast(f"✅ {message}")
+    else:
+        st.toast(f"❌ {message}")
+
 # ==================== LOGIN PAGE ====================
 def login_page():
     """Login and signup page"""
@@ -84,15 +343,14 @@ def login_page():
             submit = st.form_submit_button("Login")
             
             if submit:
-                if password != "UnoCap":
+                if not _credentials_match(password, CLIENT_PASSWORD):
                     st.error("❌ Invalid password")
                 else:
-                    user = db.authenticate_user(mobile, password, 'client')
+                    user = _auth(mobile)
                     if user:
                         st.session_state.logged_in = True
                         st.session_state.user_data = user
-                        st.success(f"✅ Welcome {user['name']}!")
-                        time.sleep(1)
+                        st.toast(f"✅ Welcome {user['name']}!")
                         st.rerun()
                     else:
                         st.error("❌ User not found. Please sign up first.")
@@ -103,7 +361,7 @@ def login_page():
         with st.form("client_signup_form"):
             name = st.text_input("Full Name")
             mobile = st.text_input("Mobile Number", max_chars=10)
-            password = st.text_input("Password", type="password", value="UnoCap", disabled=True)
+            password = st.text_input("Password", type="password", value=CLIENT_PASSWORD, disabled=True)
             submit = st.form_submit_button("Sign Up")
             
             if submit:
@@ -112,8 +370,9 @@ def login_page():
                 elif len(mobile) != 10 or not mobile.isdigit():
                     st.error("❌ Please enter a valid 10-digit mobile number")
                 else:
-                    success, message = db.create_user(name, mobile, "UnoCap", "client")
+                    success, message = get_db().create_user(name, mobile, CLIENT_PASSWORD, "client")
                     if success:
+                        _clear_client_cache()
                         st.success(f"✅ {message}. Please login.")
                     else:
                         st.error(f"❌ {message}")
@@ -127,7 +386,10 @@ def login_page():
             submit = st.form_submit_button("Login")
             
             if submit:
-                if username == "Sarbo" and password == "Sarbo":
+                # Evaluate both so the timing does not reveal which one was wrong
+                username_ok = _credentials_match(username, ADMIN_USERNAME)
+                password_ok = _credentials_match(password, ADMIN_PASSWORD)
+                if username_ok and password_ok:
                     st.session_state.logged_in = True
                     st.session_state.user_data = {
                         'user_id': 0,
@@ -135,13 +397,89 @@ def login_page():
                         'mobile': 'admin',
                         'user_type': 'admin'
                     }
-                    st.success("✅ Admin login successful!")
-                    time.sleep(1)
+                    st.toast("✅ Admin login successful!")
                     st.rerun()
                 else:
                     st.error("❌ Invalid admin credentials")
 
 # ==================== CLIENT DASHBOARD ====================
+@st.fragment
+def _add_investment_panel(user_id: int):
+    """Add Investment tab; a fragment so searching reruns only this panel"""
+    db = get_db()
+    st.subheader("Add New Investment")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        instrument_type = st.selectbox("Instrument Type", ["Stock", "Mutual Fund"])
+    
+    with col2:
+        current_investment = st.number_input("Current Investment (₹)", min_value=100.0, step=100.0)
+    
+    if instrument_type == "Mutual Fund":
+        st.info("💡 Search for mutual funds by name")
+        search_term = st.text_input("Search Mutual Fund", placeholder="e.g., HDFC Top 100, SBI Bluechip")
+    
+        if search_term and len(search_term) < MIN_MF_SEARCH_LENGTH:
+            st.caption(f"Type at least {MIN_MF_SEARCH_LENGTH} characters to search")
+        elif search_term:
+            with st.spinner("Searching..."):
+                results = _search_mf(search_term)
+    
+            if results:
+                fund_options = {f"{fund['schemeName']}": fund['schemeCode'] 
+                              for fund in results[:20]}
+    
+                selected_fund = st.selectbox("Select Fund", list(fund_options.keys()))
+    
+                if st.button("Add Mutual Fund", type="primary"):
+                    scheme_code = fund_options[selected_fund]
+                    success, message = db.add_investment(
+                        user_id,
+                        "Mutual Fund",
+                        selected_fund,
+                        current_investment,
+                        scheme_code=scheme_code
+                    )
+                    if success:
+                        _clear_portfolio_cache()
+                        st.toast(f"✅ {message}")
+                        st.rerun()
+                    else:
+                        st.error(f"❌ {message}")
+            else:
+                st.warning("No mutual funds found. Try different keywords.")
+    
+    else:  # Stock
+        st.info("💡 Enter stock symbol (e.g., RELIANCE.NS, TCS, INFY.BO)")
+        stock_symbol = st.text_input("Stock Symbol", placeholder="e.g., RELIANCE.NS").upper()
+    
+        if stock_symbol:
+            with st.spinner("Validating stock..."):
+                stock_info = get_analyzer().search_stock(stock_symbol)
+    
+            if stock_info:
+                st.success(f"✅ Found: {stock_info['name']} ({stock_info['symbol']})")
+                st.caption(f"Sector: {stock_info.get('sector', 'N/A')} | Exchange: {stock_info.get('exchange', 'N/A')}")
+    
+                if st.button("Add Stock", type="primary"):
+                    success, message = db.add_investment(
+                        user_id,
+                        "Stock",
+                        stock_info['name'],
+                        current_investment,
+                        symbol=stock_info['symbol']
+                    )
+                    if success:
+                        _clear_portfolio_cache()
+                        st.toast(f"✅ {message}")
+                        st.rerun()
+                    else:
+                        st.error(f"❌ {message}")
+            else:
+                st.error("❌ Stock not found. Please check the symbol.")
+
 def client_dashboard():
     """Client dashboard with portfolio management"""
     
@@ -158,82 +496,13 @@ def client_dashboard():
     
     # Tab 1: Add Investment
     with tab1:
-        st.subheader("Add New Investment")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            instrument_type = st.selectbox("Instrument Type", ["Stock", "Mutual Fund"])
-        
-        with col2:
-            current_investment = st.number_input("Current Investment (₹)", min_value=100.0, step=100.0)
-        
-        if instrument_type == "Mutual Fund":
-            st.info("💡 Search for mutual funds by name")
-            search_term = st.text_input("Search Mutual Fund", placeholder="e.g., HDFC Top 100, SBI Bluechip")
-            
-            if search_term:
-                with st.spinner("Searching..."):
-                    results = analyzer.search_mutual_fund(search_term)
-                
-                if results:
-                    fund_options = {f"{fund['schemeName']}": fund['schemeCode'] 
-                                  for fund in results[:20]}
-                    
-                    selected_fund = st.selectbox("Select Fund", list(fund_options.keys()))
-                    
-                    if st.button("Add Mutual Fund", type="primary"):
-                        scheme_code = fund_options[selected_fund]
-                        success, message = db.add_investment(
-                            st.session_state.user_data['user_id'],
-                            "Mutual Fund",
-                            selected_fund,
-                            current_investment,
-                            scheme_code=scheme_code
-                        )
-                        if success:
-                            st.success(f"✅ {message}")
-                            time.sleep(1)
-                            st.rerun()
-                        else:
-                            st.error(f"❌ {message}")
-                else:
-                    st.warning("No mutual funds found. Try different keywords.")
-        
-        else:  # Stock
-            st.info("💡 Enter stock symbol (e.g., RELIANCE.NS, TCS, INFY.BO)")
-            stock_symbol = st.text_input("Stock Symbol", placeholder="e.g., RELIANCE.NS").upper()
-            
-            if stock_symbol:
-                with st.spinner("Validating stock..."):
-                    stock_info = analyzer.search_stock(stock_symbol)
-                
-                if stock_info:
-                    st.success(f"✅ Found: {stock_info['name']} ({stock_info['symbol']})")
-                    st.caption(f"Sector: {stock_info.get('sector', 'N/A')} | Exchange: {stock_info.get('exchange', 'N/A')}")
-                    
-                    if st.button("Add Stock", type="primary"):
-                        success, message = db.add_investment(
-                            st.session_state.user_data['user_id'],
-                            "Stock",
-                            stock_info['name'],
-                            current_investment,
-                            symbol=stock_info['symbol']
-                        )
-                        if success:
-                            st.success(f"✅ {message}")
-                            time.sleep(1)
-                            st.rerun()
-                        else:
-                            st.error(f"❌ {message}")
-                else:
-                    st.error("❌ Stock not found. Please check the symbol.")
+        _add_investment_panel(st.session_state.user_data['user_id'])
     
     # Tab 2: My Investments
     with tab2:
         st.subheader("My Investments")
         
-        investments_df = db.get_user_investments(st.session_state.user_data['user_id'])
+        investments_df = _load_investments(st.session_state.user_data['user_id'])
         
         if investments_df.empty:
             st.info("📝 No investments added yet. Add your first investment!")
@@ -243,32 +512,28 @@ def client_dashboard():
             
             # Option to delete investment
             with st.expander("🗑️ Delete Investment"):
+                id_to_name = dict(zip(investments_df['investment_id'], investments_df['instrument_name']))
                 investment_to_delete = st.selectbox(
                     "Select investment to delete",
-                    options=investments_df['investment_id'].tolist(),
-                    format_func=lambda x: investments_df[investments_df['investment_id']==x]['instrument_name'].values[0]
+                    options=list(id_to_name),
+                    format_func=id_to_name.get
                 )
                 
-                if st.button("Delete", type="secondary"):
-                    success, message = db.delete_investment(investment_to_delete)
-                    if success:
-                        st.success(f"✅ {message}")
-                        time.sleep(1)
-                        st.rerun()
-                    else:
-                        st.error(f"❌ {message}")
+                st.button("Delete", type="secondary",
+                         on_click=_delete_investment, args=(investment_to_delete,))
     
     # Tab 3: Portfolio Analytics
     with tab3:
         st.subheader("Portfolio Analytics")
         
-        investments_df = db.get_user_investments(st.session_state.user_data['user_id'])
+        investments_df = _load_investments(st.session_state.user_data['user_id'])
         
         if investments_df.empty:
             st.info("📝 No investments to analyze. Add investments first!")
         else:
             with st.spinner("Analyzing portfolio... This may take a moment."):
-                portfolio_analysis = analyzer.analyze_portfolio(investments_df)
+                fingerprint = _portfolio_fingerprint(investments_df)
+                portfolio_analysis = _portfolio_analysis(fingerprint, investments_df)
             
             # Portfolio Summary
             col1, col2, col3, col4 = st.columns(4)
@@ -295,17 +560,13 @@ def client_dashboard():
             if portfolio_analysis['instruments']:
                 st.subheader("Investment Holdings")
                 
-                # Create a simple summary table
-                holdings_data = []
-                for instrument in portfolio_analysis['instruments']:
-                    holdings_data.append({
-                        'Instrument': instrument['name'],
-                        'Type': instrument['instrument_type'],
-                        'Invested Amount (₹)': f"₹{investments_df[investments_df['instrument_name']==instrument['name']]['current_investment'].values[0]:,.2f}" if len(investments_df[investments_df['instrument_name']==instrument['name']]) > 0 else 'N/A'
-                    })
+                # Invested amount per instrument (first match, as listed)
+                invested_by_name = investments_df.drop_duplicates('instrument_name').set_index('instrument_name')['current_investment'].to_dict()
                 
-                holdings_df = pd.DataFrame(holdings_data)
-                st.dataframe(holdings_df, use_container_width=True, hide_index=True)
+                # Create a simple summary table
+                holdings_df = _holdings_df(portfolio_analysis['holdings'], invested_by_name)
+                st.dataframe(holdings_df, use_container_width=True, hide_index=True,
+                             column_config=HOLDINGS_COLUMN_CONFIG)
                 
                 st.divider()
                 
@@ -314,118 +575,7 @@ def client_dashboard():
                 
                 for idx, instrument in enumerate(portfolio_analysis['instruments'], 1):
                     with st.expander(f"**{idx}. {instrument['name']}** - {instrument['instrument_type']}", expanded=(idx==1)):
-                        
-                        # Basic Info Section
-                        st.markdown("#### 📋 Instrument Information")
-                        metadata = instrument.get('metadata', {})
-                        
-                        if instrument['instrument_type'] == 'Mutual Fund':
-                            info_cols = st.columns(3)
-                            with info_cols[0]:
-                                st.metric("Scheme Code", metadata.get('scheme_code', 'N/A'))
-                            with info_cols[1]:
-                                st.metric("Fund House", metadata.get('fund_house', 'N/A'))
-                            with info_cols[2]:
-                                st.metric("Category", metadata.get('scheme_category', 'N/A'))
-                            
-                            st.caption(f"**Scheme Type:** {metadata.get('scheme_type', 'N/A')}")
-                        else:  # Stock
-                            info_cols = st.columns(4)
-                            with info_cols[0]:
-                                st.metric("Symbol", metadata.get('symbol', 'N/A'))
-                            with info_cols[1]:
-                                st.metric("Exchange", metadata.get('exchange', 'N/A'))
-                            with info_cols[2]:
-                                st.metric("Sector", metadata.get('sector', 'N/A'))
-                            with info_cols[3]:
-                                mkt_cap = metadata.get('marketCap', 'N/A')
-                                if isinstance(mkt_cap, (int, float)):
-                                    st.metric("Market Cap", f"₹{mkt_cap/10000000:,.0f} Cr")
-                                else:
-                                    st.metric("Market Cap", "N/A")
-                        
-                        st.divider()
-                        
-                        # Current Price & Investment
-                        st.markdown("#### 💰 Your Investment")
-                        returns = instrument.get('returns', {})
-                        
-                        inv_cols = st.columns(4)
-                        with inv_cols[0]:
-                            invested = investments_df[investments_df['instrument_name']==instrument['name']]['current_investment'].values[0] if len(investments_df[investments_df['instrument_name']==instrument['name']]) > 0 else 0
-                            st.metric("Your Investment", f"₹{invested:,.2f}")
-                        with inv_cols[1]:
-                            st.metric("Current NAV/Price", f"₹{returns.get('current_price', 0):.2f}")
-                        with inv_cols[2]:
-                            st.metric("Latest Date", returns.get('latest_date', 'N/A'))
-                        with inv_cols[3]:
-                            st.metric("Units (Estimated)", f"{returns.get('units', 0):.2f}")
-                        
-                        st.divider()
-                        
-                        # Performance Metrics
-                        st.markdown("#### 📈 Performance Returns")
-                        st.caption("*Returns are calculated based on historical performance of the instrument*")
-                        
-                        # Period Returns Table
-                        period_data = []
-                        period_labels = {
-                            'return_1_month': '1 Month',
-                            'return_3_months': '3 Months',
-                            'return_6_months': '6 Months',
-                            'return_1_year': '1 Year',
-                            'return_3_years': '3 Years'
-                        }
-                        
-                        for key, label in period_labels.items():
-                            if key in returns:
-                                row_data = {
-                                    'Period': label,
-                                    'Return (%)': f"{returns[key]:.2f}%"
-                                }
-                                # Add CAGR if available
-                                cagr_key = key.replace('return_', 'cagr_')
-                                if cagr_key in returns:
-                                    row_data['CAGR (%)'] = f"{returns[cagr_key]:.2f}%"
-                                period_data.append(row_data)
-                        
-                        if period_data:
-                            period_df = pd.DataFrame(period_data)
-                            st.dataframe(period_df, use_container_width=True, hide_index=True)
-                        else:
-                            st.info("Period returns data not available")
-                        
-                        st.divider()
-                        
-                        # Risk Metrics
-                        st.markdown("#### ⚠️ Risk Metrics")
-                        risk = instrument.get('risk_metrics', {})
-                        
-                        risk_cols = st.columns(4)
-                        with risk_cols[0]:
-                            st.metric("Volatility (Annual)", f"{risk.get('volatility', 0):.2f}%")
-                        with risk_cols[1]:
-                            st.metric("Sharpe Ratio", f"{risk.get('sharpe_ratio', 0):.2f}")
-                        with risk_cols[2]:
-                            st.metric("Max Drawdown", f"{risk.get('max_drawdown', 0):.2f}%")
-                        with risk_cols[3]:
-                            st.metric("52-Week High", f"₹{risk.get('max_price', 0):.2f}")
-                        
-                        st.caption(f"**52-Week Low:** ₹{risk.get('min_price', 0):.2f}")
-                        
-                        # Risk interpretation
-                        volatility = risk.get('volatility', 0)
-                        if volatility < 10:
-                            risk_level = "🟢 Low Risk"
-                        elif volatility < 20:
-                            risk_level = "🟡 Moderate Risk"
-                        else:
-                            risk_level = "🔴 High Risk"
-                        
-                        st.info(f"**Risk Level:** {risk_level} | **Interpretation:** " + 
-                               ("Lower volatility indicates more stable returns" if volatility < 15 else "Higher volatility indicates more fluctuation in returns"))
-                        
-                        st.markdown("---")
+                        _render_instrument_details(instrument, invested_by_name)
             
             # Download Report
             st.subheader("📄 Download Report")
@@ -437,18 +587,25 @@ def client_dashboard():
                     'created_at': 'N/A'
                 }
                 
-                report_text = portfolio_mgr.generate_client_report(user_details, portfolio_analysis)
-                
+                # Kept in session state so later reruns reuse it instead of regenerating
+                file_name = f"portfolio_report_{user_details['mobile']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+                st.session_state.report = (fingerprint, file_name,
+                                           get_portfolio_manager().generate_client_report(user_details, portfolio_analysis))
+            
+            report = st.session_state.get('report')
+            if report and report[0] == fingerprint:
+                _, file_name, report_text = report
                 st.download_button(
                     label="📥 Download Portfolio Report",
                     data=report_text,
-                    file_name=f"portfolio_report_{st.session_state.user_data['mobile']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                    file_name=file_name,
                     mime="text/plain"
                 )
 
 # ==================== ADMIN DASHBOARD ====================
 def admin_dashboard():
     """Admin dashboard to view all clients"""
+    db = get_db()
     
     st.sidebar.title("👨‍💼 Admin Panel")
     
@@ -463,13 +620,17 @@ def admin_dashboard():
     with tab1:
         st.subheader("All Registered Clients")
         
-        clients_df = db.get_all_clients()
+        total_clients = _count_clients()
         
-        if clients_df.empty:
+        if total_clients == 0:
             st.info("No clients registered yet.")
         else:
+            num_pages = -(-total_clients // CLIENTS_PAGE_SIZE)
+            page = st.number_input("Page", min_value=1, max_value=num_pages, step=1)
+            
+            clients_df = db.get_all_clients(limit=CLIENTS_PAGE_SIZE, offset=(page - 1) * CLIENTS_PAGE_SIZE)
             st.dataframe(clients_df, use_container_width=True)
-            st.caption(f"Total Clients: {len(clients_df)}")
+            st.caption(f"Total Clients: {total_clients} | Page {page} of {num_pages}")
     
     # Tab 2: Search Client
     with tab2:
@@ -478,7 +639,7 @@ def admin_dashboard():
         mobile_search = st.text_input("Enter Mobile Number", max_chars=10)
         
         if st.button("Search", type="primary") and mobile_search:
-            user = db.get_user_by_mobile(mobile_search)
+            user = _lookup_client(mobile_search)
             
             if not user:
                 st.error("❌ Client not found")
@@ -498,7 +659,7 @@ def admin_dashboard():
                 st.divider()
                 
                 # Get investments
-                investments_df = db.get_user_investments(user['user_id'])
+                investments_df = _load_investments(user['user_id'])
                 
                 if investments_df.empty:
                     st.warning("This client has no investments yet.")
@@ -506,7 +667,8 @@ def admin_dashboard():
                     st.subheader("📊 Portfolio Details")
                     
                     with st.spinner("Analyzing portfolio..."):
-                        portfolio_analysis = analyzer.analyze_portfolio(investments_df)
+                        fingerprint = _portfolio_fingerprint(investments_df)
+                        portfolio_analysis = _portfolio_analysis(fingerprint, investments_df)
                     
                     # Portfolio Summary
                     col1, col2, col3, col4 = st.columns(4)
@@ -530,17 +692,13 @@ def admin_dashboard():
                     # Investment List
                     st.subheader("📊 Portfolio Holdings")
                     
-                    # Simple holdings table
-                    holdings_data = []
-                    for instrument in portfolio_analysis['instruments']:
-                        holdings_data.append({
-                            'Instrument': instrument['name'],
-                            'Type': instrument['instrument_type'],
-                            'Invested Amount (₹)': f"₹{investments_df[investments_df['instrument_name']==instrument['name']]['current_investment'].values[0]:,.2f}" if len(investments_df[investments_df['instrument_name']==instrument['name']]) > 0 else 'N/A'
-                        })
+                    # Invested amount per instrument (first match, as listed)
+                    invested_by_name = investments_df.drop_duplicates('instrument_name').set_index('instrument_name')['current_investment'].to_dict()
                     
-                    holdings_df = pd.DataFrame(holdings_data)
-                    st.dataframe(holdings_df, use_container_width=True, hide_index=True)
+                    # Simple holdings table
+                    holdings_df = _holdings_df(portfolio_analysis['holdings'], invested_by_name)
+                    st.dataframe(holdings_df, use_container_width=True, hide_index=True,
+                                 column_config=HOLDINGS_COLUMN_CONFIG)
                     
                     st.divider()
                     
@@ -549,128 +707,23 @@ def admin_dashboard():
                     
                     for idx, instrument in enumerate(portfolio_analysis['instruments'], 1):
                         with st.expander(f"**{idx}. {instrument['name']}** - {instrument['instrument_type']}", expanded=False):
-                            
-                            # Basic Info Section
-                            st.markdown("#### 📋 Instrument Information")
-                            metadata = instrument.get('metadata', {})
-                            
-                            if instrument['instrument_type'] == 'Mutual Fund':
-                                info_cols = st.columns(3)
-                                with info_cols[0]:
-                                    st.metric("Scheme Code", metadata.get('scheme_code', 'N/A'))
-                                with info_cols[1]:
-                                    st.metric("Fund House", metadata.get('fund_house', 'N/A'))
-                                with info_cols[2]:
-                                    st.metric("Category", metadata.get('scheme_category', 'N/A'))
-                                
-                                st.caption(f"**Scheme Type:** {metadata.get('scheme_type', 'N/A')}")
-                            else:  # Stock
-                                info_cols = st.columns(4)
-                                with info_cols[0]:
-                                    st.metric("Symbol", metadata.get('symbol', 'N/A'))
-                                with info_cols[1]:
-                                    st.metric("Exchange", metadata.get('exchange', 'N/A'))
-                                with info_cols[2]:
-                                    st.metric("Sector", metadata.get('sector', 'N/A'))
-                                with info_cols[3]:
-                                    mkt_cap = metadata.get('marketCap', 'N/A')
-                                    if isinstance(mkt_cap, (int, float)):
-                                        st.metric("Market Cap", f"₹{mkt_cap/10000000:,.0f} Cr")
-                                    else:
-                                        st.metric("Market Cap", "N/A")
-                            
-                            st.divider()
-                            
-                            # Current Price & Investment
-                            st.markdown("#### 💰 Client Investment")
-                            returns = instrument.get('returns', {})
-                            
-                            inv_cols = st.columns(4)
-                            with inv_cols[0]:
-                                invested = investments_df[investments_df['instrument_name']==instrument['name']]['current_investment'].values[0] if len(investments_df[investments_df['instrument_name']==instrument['name']]) > 0 else 0
-                                st.metric("Client Investment", f"₹{invested:,.2f}")
-                            with inv_cols[1]:
-                                st.metric("Current NAV/Price", f"₹{returns.get('current_price', 0):.2f}")
-                            with inv_cols[2]:
-                                st.metric("Latest Date", returns.get('latest_date', 'N/A'))
-                            with inv_cols[3]:
-                                st.metric("Units (Estimated)", f"{returns.get('units', 0):.2f}")
-                            
-                            st.divider()
-                            
-                            # Performance Metrics
-                            st.markdown("#### 📈 Performance Returns")
-                            st.caption("*Returns are calculated based on historical performance of the instrument*")
-                            
-                            # Period Returns Table
-                            period_data = []
-                            period_labels = {
-                                'return_1_month': '1 Month',
-                                'return_3_months': '3 Months',
-                                'return_6_months': '6 Months',
-                                'return_1_year': '1 Year',
-                                'return_3_years': '3 Years'
-                            }
-                            
-                            for key, label in period_labels.items():
-                                if key in returns:
-                                    row_data = {
-                                        'Period': label,
-                                        'Return (%)': f"{returns[key]:.2f}%"
-                                    }
-                                    # Add CAGR if available
-                                    cagr_key = key.replace('return_', 'cagr_')
-                                    if cagr_key in returns:
-                                        row_data['CAGR (%)'] = f"{returns[cagr_key]:.2f}%"
-                                    period_data.append(row_data)
-                            
-                            if period_data:
-                                period_df = pd.DataFrame(period_data)
-                                st.dataframe(period_df, use_container_width=True, hide_index=True)
-                            else:
-                                st.info("Period returns data not available")
-                            
-                            st.divider()
-                            
-                            # Risk Metrics
-                            st.markdown("#### ⚠️ Risk Metrics")
-                            risk = instrument.get('risk_metrics', {})
-                            
-                            risk_cols = st.columns(4)
-                            with risk_cols[0]:
-                                st.metric("Volatility (Annual)", f"{risk.get('volatility', 0):.2f}%")
-                            with risk_cols[1]:
-                                st.metric("Sharpe Ratio", f"{risk.get('sharpe_ratio', 0):.2f}")
-                            with risk_cols[2]:
-                                st.metric("Max Drawdown", f"{risk.get('max_drawdown', 0):.2f}%")
-                            with risk_cols[3]:
-                                st.metric("52-Week High", f"₹{risk.get('max_price', 0):.2f}")
-                            
-                            st.caption(f"**52-Week Low:** ₹{risk.get('min_price', 0):.2f}")
-                            
-                            # Risk interpretation
-                            volatility = risk.get('volatility', 0)
-                            if volatility < 10:
-                                risk_level = "🟢 Low Risk"
-                            elif volatility < 20:
-                                risk_level = "🟡 Moderate Risk"
-                            else:
-                                risk_level = "🔴 High Risk"
-                            
-                            st.info(f"**Risk Level:** {risk_level} | **Interpretation:** " + 
-                                   ("Lower volatility indicates more stable returns" if volatility < 15 else "Higher volatility indicates more fluctuation in returns"))
-                            
-                            st.markdown("---")
+                            _render_instrument_details(instrument, invested_by_name, viewer_label="Client")
                     
                     # Download Report
                     st.subheader("📄 Download Client Report")
                     
-                    report_text = portfolio_mgr.generate_client_report(user, portfolio_analysis)
+                    # Regenerate only when this client's portfolio differs from the last report
+                    report = st.session_state.get('admin_report')
+                    if not report or report[0] != fingerprint:
+                        file_name = f"client_report_{user['mobile']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+                        report = (fingerprint, file_name, get_portfolio_manager().generate_client_report(user, portfolio_analysis))
+                        st.session_state.admin_report = report
                     
+                    _, file_name, report_text = report
                     st.download_button(
                         label="📥 Download Full Report",
                         data=report_text,
-                        file_name=f"client_report_{user['mobile']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                        file_name=file_name,
                         mime="text/plain"
                     )
 
@@ -4,95 +4,172 @@ SQLite database for users and investments
 """
 
 import sqlite3
+import json
 import pandas as pd
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 import hashlib
+import hmac
+import os
+import threading
+from contextlib import contextmanager
+
+PASSWORD_SCHEME = "scrypt"
+
+def hash_password(password: str) -> str:
+    """Hash a password with scrypt under a fresh random salt"""
+    salt = os.urandom(16)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=16384, r=8, p=1)
+    return f"{PASSWORD_SCHEME}${salt.hex()}${digest.hex()}"
+
+def verify_password(password: str, stored: str) -> bool:
+    """Check a password against a stored scrypt hash in constant time"""
+    try:
+        scheme, salt, digest = stored.split('$')
+    except ValueError:
+        return False
+    if scheme != PASSWORD_SCHEME:
+        return False
+    
+    candidate = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt), n=16384, r=8, p=1)
+    return hmac.compare_digest(candidate, bytes.fromhex(digest))
 
 class DatabaseManager:
     """Manage SQLite database for users and investments"""
     
     def __init__(self, db_name: str = "financial_analyzer.db"):
         self.db_name = db_name
+        # One connection per manager, shared by Streamlit's script threads and the analyzer's
+        # fetch workers; the lock keeps their statements and transactions from interleaving
+        self._conn = self._open_connection()
+        self._lock = threading.RLock()
         self.init_database()
     
-    def get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_name, check_same_thread=False)
+    @contextmanager
+    def connection(self):
+        """Hold the shared connection; commits on success, rolls back on error"""
+        with self._lock:
+            try:
+                yield self._conn
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+    
+    def _open_connection(self):
+        """Open the manager's shared connection; only __init__ calls this, use connection() instead"""
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        # Per-connection tuning: WAL only needs NORMAL syncs, memory-map the file,
+        # keep a larger page cache and build temp sort/index structures in memory
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA mmap_size = 268435456")
+        conn.execute("PRAGMA cache_size = -8192")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
     
     def init_database(self):
         """Initialize database tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                mobile TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                user_type TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Investments table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS investments (
-                investment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                instrument_type TEXT NOT NULL,
-                instrument_name TEXT NOT NULL,
-                scheme_code TEXT,
-                symbol TEXT,
-                current_investment REAL NOT NULL,
-                date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(user_id)
-            )
-        """)
-        
-        conn.commit()
-        conn.close()
-    
-    def create_user(self, name: str, mobile: str, password: str, user_type: str = "client") -> Tuple[bool, str]:
-        """Create new user"""
-        try:
-            conn = self.get_connection()
+        with self.connection() as conn:
             cursor = conn.cursor()
             
-            # Check if mobile already exists
-            cursor.execute("SELECT mobile FROM users WHERE mobile = ?", (mobile,))
-            if cursor.fetchone():
-                return False, "Mobile number already registered"
+            # WAL lets readers run alongside NAV history writes; the mode persists in the file
+            cursor.execute("PRAGMA journal_mode = WAL")
+            
+            # Users table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    mobile TEXT UNIQUE NOT NULL,
+                    password TEXT NOT NULL,
+                    user_type TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Investments table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS investments (
+                    investment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    instrument_type TEXT NOT NULL,
+                    instrument_name TEXT NOT NULL,
+                    scheme_code TEXT,
+                    symbol TEXT,
+                    current_investment REAL NOT NULL,
+                    date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users(user_id)
+                )
+            """)
+            
+            # Cover the per-user investments listing and the admin's client listing, both in display order
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_inv_user_date ON investments(user_id, date_added DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_type ON users(user_type, created_at DESC)")
             
+            # Mutual fund metadata, with when its NAV history was last synced
             cursor.execute("""
-                INSERT INTO users (name, mobile, password, user_type)
-                VALUES (?, ?, ?, ?)
-            """, (name, mobile, password, user_type))
+                CREATE TABLE IF NOT EXISTS mf_schemes (
+                    scheme_code TEXT PRIMARY KEY,
+                    meta TEXT NOT NULL,
+                    fetched_at TIMESTAMP NOT NULL
+                )
+            """)
             
-            conn.commit()
-            conn.close()
+            # Mutual fund NAV history; the primary key doubles as the (scheme_code, date) index
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS nav_history (
+                    scheme_code TEXT NOT NULL,
+                    date DATE NOT NULL,
+                    nav REAL,
+                    PRIMARY KEY (scheme_code, date)
+                ) WITHOUT ROWID
+            """)
+            
+            # Hash any passwords still stored in plaintext
+            cursor.execute("SELECT user_id, password FROM users WHERE password NOT LIKE ?", (f"{PASSWORD_SCHEME}$%",))
+            plaintext = cursor.fetchall()
+            if plaintext:
+                cursor.executemany(
+                    "UPDATE users SET password = ? WHERE user_id = ?",
+                    [(hash_password(password), user_id) for user_id, password in plaintext]
+                )
+    
+    def create_user(self, name: str, mobile: str, password: str, user_type: str = "client") -> Tuple[bool, str]:
+        """Create new user"""
+        try:
+            # Hash before taking the connection lock; scrypt is deliberately slow
+            password_hash = hash_password(password)
+            
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                # The UNIQUE constraint on mobile rejects duplicates, no pre-check needed
+                cursor.execute("""
+                    INSERT INTO users (name, mobile, password, user_type)
+                    VALUES (?, ?, ?, ?)
+                """, (name, mobile, password_hash, user_type))
             return True, "User created successfully"
+        except sqlite3.IntegrityError:
+            return False, "Mobile number already registered"
         except Exception as e:
             return False, f"Error creating user: {str(e)}"
     
     def authenticate_user(self, mobile: str, password: str, user_type: str) -> Optional[Dict]:
         """Authenticate user and return user details"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT user_id, name, mobile, user_type
-                FROM users
-                WHERE mobile = ? AND password = ? AND user_type = ?
-            """, (mobile, password, user_type))
-            
-            user = cursor.fetchone()
-            conn.close()
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                # mobile is UNIQUE, so this is a single index lookup; the hash is checked afterwards
+                cursor.execute("""
+                    SELECT user_id, name, mobile, user_type, password
+                    FROM users
+                    WHERE mobile = ? AND user_type = ?
+                """, (mobile, user_type))
+                
+                user = cursor.fetchone()
             
-            if user:
+            if user and verify_password(password, user[4]):
                 return {
                     'user_id': user[0],
                     'name': user[1],
@@ -109,17 +186,14 @@ class DatabaseManager:
                       symbol: str = None) -> Tuple[bool, str]:
         """Add investment for a user"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO investments (user_id, instrument_type, instrument_name,
-                                       scheme_code, symbol, current_investment)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (user_id, instrument_type, instrument_name, scheme_code, symbol, current_investment))
-            
-            conn.commit()
-            conn.close()
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    INSERT INTO investments (user_id, instrument_type, instrument_name,
+                                           scheme_code, symbol, current_investment)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (user_id, instrument_type, instrument_name, scheme_code, symbol, current_investment))
             return True, "Investment added successfully"
         except Exception as e:
             return False, f"Error adding investment: {str(e)}"
@@ -127,16 +201,17 @@ class DatabaseManager:
     def get_user_investments(self, user_id: int) -> pd.DataFrame:
         """Get all investments for a user"""
         try:
-            conn = self.get_connection()
-            query = """
-                SELECT investment_id, instrument_type, instrument_name,
-                       scheme_code, symbol, current_investment, date_added
-                FROM investments
-                WHERE user_id = ?
-                ORDER BY date_added DESC
-            """
-            df = pd.read_sql_query(query, conn, params=(user_id,))
-            conn.close()
+            with self.connection() as conn:
+                query = """
+                    SELECT investment_id, instrument_type, instrument_name,
+                           scheme_code, symbol, current_investment, date_added
+                    FROM investments
+                    WHERE user_id = ?
+                    ORDER BY date_added DESC
+                """
+                # Explicit dtypes, so an empty portfolio still has numeric id/amount columns
+                df = pd.read_sql_query(query, conn, params=(user_id,),
+                                       dtype={'investment_id': 'int64', 'current_investment': 'float64'})
             return df
         except Exception as e:
             print(f"Error fetching investments: {e}")
@@ -145,17 +220,16 @@ class DatabaseManager:
     def get_user_by_mobile(self, mobile: str) -> Optional[Dict]:
         """Get user details by mobile number"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT user_id, name, mobile, user_type, created_at
-                FROM users
-                WHERE mobile = ? AND user_type = 'client'
-            """, (mobile,))
-            
-            user = cursor.fetchone()
-            conn.close()
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    SELECT user_id, name, mobile, user_type, created_at
+                    FROM users
+                    WHERE mobile = ? AND user_type = 'client'
+                """, (mobile,))
+                
+                user = cursor.fetchone()
             
             if user:
                 return {
@@ -173,30 +247,105 @@ class DatabaseManager:
     def delete_investment(self, investment_id: int) -> Tuple[bool, str]:
         """Delete an investment"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("DELETE FROM investments WHERE investment_id = ?", (investment_id,))
-            
-            conn.commit()
-            conn.close()
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("DELETE FROM investments WHERE investment_id = ?", (investment_id,))
             return True, "Investment deleted successfully"
         except Exception as e:
             return False, f"Error deleting investment: {str(e)}"
     
-    def get_all_clients(self) -> pd.DataFrame:
-        """Get all client users"""
+    def get_all_clients(self, limit: Optional[int] = None, offset: int = 0) -> pd.DataFrame:
+        """Get client users, optionally one page at a time"""
         try:
-            conn = self.get_connection()
-            query = """
-                SELECT user_id, name, mobile, created_at
-                FROM users
-                WHERE user_type = 'client'
-                ORDER BY created_at DESC
-            """
-            df = pd.read_sql_query(query, conn)
-            conn.close()
+            with self.connection() as conn:
+                query = """
+                    SELECT user_id, name, mobile, created_at
+                    FROM users
+                    WHERE user_type = 'client'
+                    ORDER BY created_at DESC
+                    LIMIT ? OFFSET ?
+                """
+                # SQLite treats a negative LIMIT as no limit
+                df = pd.read_sql_query(query, conn, params=(limit if limit is not None else -1, offset))
             return df
         except Exception as e:
             print(f"Error fetching clients: {e}")
+            return pd.DataFrame()
+    
+    def count_clients(self) -> int:
+        """Count client users"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("SELECT COUNT(*) FROM users WHERE user_type = 'client'")
+                count = cursor.fetchone()[0]
+                
+            return count
+        except Exception as e:
+            print(f"Error counting clients: {e}")
+            return 0
+    
+    def get_mf_scheme(self, scheme_code: str) -> Optional[Dict]:
+        """Get stored mutual fund metadata and when it was last synced"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("SELECT meta, fetched_at FROM mf_schemes WHERE scheme_code = ?", (str(scheme_code),))
+                
+                row = cursor.fetchone()
+            
+            if row:
+                return {
+                    'meta': json.loads(row[0]),
+                    'fetched_at': datetime.fromisoformat(row[1])
+                }
+            return None
+        except Exception as e:
+            print(f"Error fetching scheme: {e}")
+            return None
+    
+    def save_mf_scheme(self, scheme_code: str, meta: Dict, nav_df: pd.DataFrame) -> bool:
+        """Store mutual fund metadata and append NAVs newer than the stored history"""
+        try:
+            scheme_code = str(scheme_code)
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("SELECT MAX(date) FROM nav_history WHERE scheme_code = ?", (scheme_code,))
+                last_date = cursor.fetchone()[0]
+                
+                nav_df = nav_df.dropna(subset=['date'])
+                if last_date:
+                    nav_df = nav_df[nav_df['date'] > pd.Timestamp(last_date)]
+                
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO nav_history (scheme_code, date, nav) VALUES (?, ?, ?)",
+                    zip([scheme_code] * len(nav_df), nav_df['date'].dt.strftime('%Y-%m-%d'), nav_df['Close'])
+                )
+                cursor.execute("""
+                    INSERT OR REPLACE INTO mf_schemes (scheme_code, meta, fetched_at)
+                    VALUES (?, ?, ?)
+                """, (scheme_code, json.dumps(meta), datetime.now().isoformat()))
+            return True
+        except Exception as e:
+            print(f"Error saving NAV history: {e}")
+            return False
+    
+    def get_nav_history(self, scheme_code: str) -> pd.DataFrame:
+        """Get stored NAV history for a scheme, oldest first"""
+        try:
+            with self.connection() as conn:
+                query = """
+                    SELECT date, nav AS Close
+                    FROM nav_history
+                    WHERE scheme_code = ?
+                    ORDER BY date
+                """
+                df = pd.read_sql_query(query, conn, params=(str(scheme_code),), parse_dates=['date'])
+            return df
+        except Exception as e:
+            print(f"Error fetching NAV history: {e}")
             return pd.DataFrame()
\ No newline at end of file
@@ -2,21 +2,189 @@
 Core Financial Analyzer for Mutual Funds and Stocks
 """
 
+import io
+import re
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
+import streamlit as st
 import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-import warnings
-warnings.filterwarnings('ignore')
+from database import DatabaseManager
+
+try:
+    import orjson
+except ImportError:  # optional: mfapi payloads parse with the stdlib json module without it
+    orjson = None
+
+# Per-instrument return fields flattened into the portfolio's columnar holdings view
+HOLDINGS_RETURN_FIELDS = ('invested_amount', 'current_value', 'absolute_return', 'return_percentage', 'current_price')
+
+# Trailing return periods, the single definition the dashboard and report also use:
+# name, display label, calendar days and result keys; CAGR is reported for a year or more
+RETURN_PERIOD_NAMES = ('1_month', '3_months', '6_months', '1_year', '3_years')
+RETURN_PERIOD_LABELS = ('1 Month', '3 Months', '6 Months', '1 Year', '3 Years')
+RETURN_PERIOD_DAYS = np.array([30, 90, 180, 365, 1095])
+RETURN_KEYS = tuple(f'return_{name}' for name in RETURN_PERIOD_NAMES)
+CAGR_KEYS = tuple(f'cagr_{name}' for name in RETURN_PERIOD_NAMES)
+
+# NSE's list of listed equities, and the shape of an NSE symbol as yfinance spells it
+NSE_EQUITY_LIST_URL = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
+NSE_SYMBOL_PATTERN = re.compile(r'[A-Z0-9&-]{1,20}\.NS')
+
+# ==================== CACHED FETCHERS ====================
+# NAV/price series change at most once a day, so responses are shared across reruns
+# and sessions. Failures raise instead of returning, which keeps them out of the cache.
+
+@st.cache_data(ttl=3600, show_spinner=False, max_entries=512)
+def _fetch_mf_details(_session: requests.Session, url: str) -> Dict:
+    """Fetch a scheme's mfapi payload (meta + NAV history)"""
+    response = _session.get(url, timeout=10)
+    response.raise_for_status()
+    return orjson.loads(response.content) if orjson else response.json()
+
+def _parse_mf_history(fund_data: Dict) -> pd.DataFrame:
+    """Convert a scheme's NAV payload into a date-sorted frame"""
+    # Not memoized: the result depends on the payload, and callers already cache downstream
+    if 'data' not in fund_data:
+        return pd.DataFrame()
+    
+    data = fund_data['data']
+    if not data:
+        return pd.DataFrame()
+    
+    try:
+        # Fast path: rewrite dd-mm-yyyy as ISO and parse both columns straight into arrays
+        dates = np.array([f"{row['date'][6:]}-{row['date'][3:5]}-{row['date'][:2]}" for row in data],
+                         dtype='datetime64[D]').astype('datetime64[ns]')
+        navs = np.fromiter((float(row['nav']) for row in data), dtype=np.float64, count=len(data))
+    except (KeyError, TypeError, ValueError):
+        # Malformed rows: let pandas coerce them to NaT/NaN instead
+        df = pd.DataFrame(data)
+        dates = pd.to_datetime(df['date'], format='%d-%m-%Y', errors='coerce').to_numpy(dtype='datetime64[ns]')
+        navs = pd.to_numeric(df['nav'], errors='coerce').to_numpy(dtype=np.float64)
+    
+    # mfapi lists newest first; a stable sort keeps same-day rows in payload order
+    order = np.argsort(dates, kind='stable')
+    return pd.DataFrame({'date': dates[order], 'Close': navs[order]})
+
+@st.cache_data(ttl=3600, show_spinner=False, max_entries=512)
+def _fetch_stock_history(symbol: str, period: str) -> pd.DataFrame:
+    """Fetch a symbol's price history from yfinance"""
+    df = yf.Ticker(symbol).history(period=period)
+    
+    # yfinance reports failed requests as an empty frame, so treat empty as an error
+    if df.empty:
+        raise LookupError(f"No price history for {symbol}")
+    
+    return df.reset_index().rename(columns={'Date': 'date'})
+
+@st.cache_data(ttl=3600, show_spinner=False, max_entries=512)
+def _download_many(symbols: tuple, period: str) -> pd.DataFrame:
+    """Fetch several symbols' price histories in one batched yfinance download"""
+    # auto_adjust matches Ticker.history's default, so closes agree with _fetch_stock_history
+    data = yf.download(tickers=list(symbols), period=period, group_by='ticker',
+                       threads=True, progress=False, auto_adjust=True)
+    
+    if data.empty:
+        raise LookupError(f"No price history for {', '.join(symbols)}")
+    return data
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _fetch_nse_symbols(_session: requests.Session) -> Dict[str, str]:
+    """Fetch NSE's listed equities as {symbol: company name}"""
+    # NSE rejects requests without a browser-like user agent
+    response = _session.get(NSE_EQUITY_LIST_URL, timeout=5, headers={'User-Agent': 'Mozilla/5.0'})
+    response.raise_for_status()
+    
+    listing = pd.read_csv(io.StringIO(response.text), usecols=['SYMBOL', 'NAME OF COMPANY'], dtype=str)
+    return dict(zip(listing['SYMBOL'].str.strip(), listing['NAME OF COMPANY'].str.strip()))
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _nse_symbols(_session: requests.Session) -> Dict[str, str]:
+    """NSE's listed equities, or {} for a few minutes after a failed fetch"""
+    # NSE often blocks non-browser clients; remember the failure briefly instead of
+    # paying the timeout and retries on every lookup
+    try:
+        return _fetch_nse_symbols(_session)
+    except Exception as e:
+        print(f"Error fetching NSE symbol list: {e}")
+        return {}
+
+@st.cache_data(ttl=3600, show_spinner=False, max_entries=512)
+def _lookup_stock(_session: requests.Session, symbol: str) -> Dict:
+    """Resolve a symbol to its listing and metadata, raising if none; NSE's list only skips the price probe, .info is still called"""
+    if '.' not in symbol:
+        test_symbols = [f"{symbol}.NS", f"{symbol}.BO"]
+    else:
+        test_symbols = [symbol]
+    
+    nse_symbols = _nse_symbols(_session)
+    
+    for test_symbol in test_symbols:
+        # A symbol on NSE's list is known to exist; anything else needs a network probe,
+        # and a short price history is a far cheaper one than the info endpoint
+        listed_name = None
+        if NSE_SYMBOL_PATTERN.fullmatch(test_symbol):
+            listed_name = nse_symbols.get(test_symbol[:-3])
+        
+        if listed_name is None:
+            try:
+                if _fetch_stock_history(test_symbol, '5d').empty:
+                    continue
+            except Exception:
+                continue
+        
+        # Only the listing that exists pays for one info call, for the display metadata
+        try:
+            info = yf.Ticker(test_symbol).info or {}
+        except Exception:
+            info = {}
+        
+        return {
+            'symbol': test_symbol,
+            'name': info.get('longName', info.get('shortName', listed_name or test_symbol)),
+            'sector': info.get('sector', 'N/A'),
+            'industry': info.get('industry', 'N/A'),
+            'exchange': info.get('exchange', 'N/A'),
+            'marketCap': info.get('marketCap', 'N/A')
+        }
+    
+    raise LookupError(f"No listing found for {symbol}")
+
+@st.cache_data(ttl=1800, show_spinner=False, max_entries=2048)
+def _load_instrument(_analyzer: 'FinancialAnalyzer', instrument_type: str, identifier: str,
+                     _prefetched: Dict) -> Dict:
+    """An instrument's name, metadata, history and risk metrics; raises if it can't be loaded"""
+    instrument = _analyzer.load_instrument(instrument_type, identifier, _prefetched)
+    if instrument is None:
+        raise LookupError(f"No data for {instrument_type} {identifier}")
+    return instrument
 
 class FinancialAnalyzer:
     """Analyzer for both mutual funds and stocks"""
     
     MF_BASE_URL = "https://api.mfapi.in/mf"
+    MAX_FETCH_WORKERS = 16
+    # mfapi publishes at most one NAV a day, so stored histories are resynced this often
+    MF_REFRESH_INTERVAL = timedelta(days=1)
     
-    def __init__(self):
-        pass
+    def __init__(self, db: Optional[DatabaseManager] = None):
+        # NAV histories persist in the database when one is given, instead of refetching per rerun
+        self.db = db
+        
+        # One pooled keep-alive session so concurrent MF calls reuse TCP/TLS connections;
+        # the pool holds more connections than there are fetch workers, and dropped
+        # connections are retried briefly instead of failing the instrument
+        self.session = requests.Session()
+        self.session.headers.update({'Accept-Encoding': 'gzip'})
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32,
+                              max_retries=Retry(total=2, backoff_factor=0.2))
+        self.session.mount('https://', adapter)
     
     # ==================== MUTUAL FUND METHODS ====================
     
@@ -24,7 +192,7 @@ class FinancialAnalyzer:
         """Search for mutual funds by name"""
         try:
             search_url = f"{self.MF_BASE_URL}/search?q={fund_name}"
-            response = requests.get(search_url, timeout=10)
+            response = self.session.get(search_url, timeout=10)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -34,32 +202,45 @@ class FinancialAnalyzer:
     def get_mf_details(self, scheme_code: str) -> Optional[Dict]:
         """Get mutual fund details"""
         try:
-            url = f"{self.MF_BASE_URL}/{scheme_code}"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return _fetch_mf_details(self.session, f"{self.MF_BASE_URL}/{scheme_code}")
         except Exception as e:
             print(f"Error fetching fund details: {e}")
             return None
     
+    def sync_mf_scheme(self, scheme_code: str) -> Optional[Dict]:
+        """Get a scheme's meta, refreshing its stored NAV history once it is out of date"""
+        stored = self.db.get_mf_scheme(scheme_code) if self.db else None
+        if stored and datetime.now() - stored['fetched_at'] < self.MF_REFRESH_INTERVAL:
+            return stored['meta']
+        
+        fund_data = self.get_mf_details(scheme_code)
+        if not fund_data:
+            # Serve the stale copy rather than nothing when mfapi is unreachable
+            return stored['meta'] if stored else None
+        
+        meta = fund_data.get('meta', {})
+        if self.db:
+            try:
+                self.db.save_mf_scheme(scheme_code, meta, _parse_mf_history(fund_data))
+            except Exception as e:
+                # A malformed payload only drops this scheme, keeping any stored copy
+                print(f"Error syncing MF history: {e}")
+                return stored['meta'] if stored else None
+        return meta
+    
     def get_mf_historical_data(self, scheme_code: str) -> pd.DataFrame:
-        """Get mutual fund historical NAV data"""
+        """Get mutual fund historical NAV data, from the stored history or mfapi"""
         try:
-            fund_data = self.get_mf_details(scheme_code)
+            if self.db:
+                df = self.db.get_nav_history(scheme_code)
+                if not df.empty:
+                    return df
             
-            if not fund_data or 'data' not in fund_data:
-                return pd.DataFrame()
-            
-            df = pd.DataFrame(fund_data['data'])
-            if df.empty:
+            fund_data = self.get_mf_details(scheme_code)
+            if not fund_data:
                 return pd.DataFrame()
             
-            df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y', errors='coerce')
-            df['nav'] = pd.to_numeric(df['nav'], errors='coerce')
-            df = df.sort_values('date').reset_index(drop=True)
-            df = df.rename(columns={'nav': 'Close'})
-            
-            return df
+            return _parse_mf_history(fund_data)
         except Exception as e:
             print(f"Error fetching MF historical data: {e}")
             return pd.DataFrame()
@@ -69,27 +250,8 @@ class FinancialAnalyzer:
     def search_stock(self, symbol: str) -> Optional[Dict]:
         """Search and validate stock symbol"""
         try:
-            if '.' not in symbol:
-                test_symbols = [f"{symbol}.NS", f"{symbol}.BO"]
-            else:
-                test_symbols = [symbol]
-            
-            for test_symbol in test_symbols:
-                try:
-                    ticker = yf.Ticker(test_symbol)
-                    info = ticker.info
-                    
-                    if info and 'symbol' in info:
-                        return {
-                            'symbol': test_symbol,
-                            'name': info.get('longName', info.get('shortName', test_symbol)),
-                            'sector': info.get('sector', 'N/A'),
-                            'industry': info.get('industry', 'N/A'),
-                            'exchange': info.get('exchange', 'N/A'),
-                            'marketCap': info.get('marketCap', 'N/A')
-                        }
-                except:
-                    continue
+            return _lookup_stock(self.session, symbol)
+        except LookupError:
             return None
         except Exception as e:
             print(f"Error searching stock: {e}")
@@ -98,20 +260,57 @@ class FinancialAnalyzer:
     def get_stock_historical_data(self, symbol: str, period: str = "max") -> pd.DataFrame:
         """Get stock historical data"""
         try:
-            ticker = yf.Ticker(symbol)
-            df = ticker.history(period=period)
-            
-            if df.empty:
-                return pd.DataFrame()
-            
-            df = df.reset_index()
-            df.columns = [col.lower() if col == 'Date' else col for col in df.columns]
-            
-            return df
+            return _fetch_stock_history(symbol, period)
         except Exception as e:
             print(f"Error fetching stock data: {e}")
             return pd.DataFrame()
     
+    def get_stock_histories(self, symbols: List[str], period: str = "max") -> Dict[str, pd.DataFrame]:
+        """Get historical data for several stocks in one batched download"""
+        if not symbols:
+            return {}
+        
+        try:
+            data = _download_many(tuple(sorted(set(symbols))), period)
+        except Exception as e:
+            print(f"Error fetching stock data: {e}")
+            return {}
+        
+        histories = {}
+        for symbol in symbols:
+            if data.empty or symbol not in data.columns.get_level_values(0):
+                continue
+            
+            # Rows are the union of all symbols' trading days
+            df = data[symbol].dropna(how='all')
+            if df.empty:
+                continue
+            
+            histories[symbol] = df.reset_index().rename(columns={'Date': 'date'})
+        
+        return histories
+    
+    def prefetch_histories(self, scheme_codes: List[str], symbols: List[str]) -> Dict[str, Dict]:
+        """Sync MF histories and fetch stock histories concurrently, keyed by identifier"""
+        scheme_codes, symbols = set(scheme_codes), sorted(set(symbols))
+        if not scheme_codes and not symbols:
+            return {'mf': {}, 'stock': {}}
+        
+        # Network bound: threads overlap the round-trips instead of paying them in sequence.
+        # All stocks share one batched download running alongside the MF calls, and the NSE
+        # symbol list is loaded once here so the per-stock lookups that follow don't each fetch it
+        workers = min(self.MAX_FETCH_WORKERS, len(scheme_codes) + 2)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            mf_futures = {code: executor.submit(self.sync_mf_scheme, code) for code in scheme_codes}
+            stock_future = executor.submit(self.get_stock_histories, symbols)
+            if symbols:
+                executor.submit(_nse_symbols, self.session)
+        
+        return {
+            'mf': {code: future.result() for code, future in mf_futures.items()},
+            'stock': stock_future.result()
+        }
+    
     # ==================== ANALYSIS METHODS ====================
     
     def calculate_returns(self, df: pd.DataFrame, current_investment: float) -> Dict:
@@ -119,8 +318,12 @@ class FinancialAnalyzer:
         if df.empty or len(df) < 2:
             return {}
         
-        latest_price = df.iloc[-1]['Close']
-        oldest_price = df.iloc[0]['Close']
+        # df is date-sorted, so past prices are found by binary search over the raw arrays
+        dates = df['date'].to_numpy(dtype='datetime64[ns]')
+        prices = df['Close'].to_numpy()
+        
+        latest_price = prices[-1]
+        oldest_price = prices[0]
         
         # Calculate units based on oldest price
         units = current_investment / oldest_price
@@ -138,30 +341,23 @@ class FinancialAnalyzer:
             'latest_date': df.iloc[-1]['date'].strftime('%Y-%m-%d')
         }
         
-        # Calculate period returns
-        periods = {
-            '1_month': 30,
-            '3_months': 90,
-            '6_months': 180,
-            '1_year': 365,
-            '3_years': 1095
-        }
+        # Calculate period returns: the period count is fixed, so all five are one vectorized gather
+        past_dates = dates[-1] - RETURN_PERIOD_DAYS.astype('timedelta64[D]')
+        past_idxs = np.searchsorted(dates, past_dates, side='right') - 1
+        has_past = past_idxs >= 0
+        past_prices = prices[np.maximum(past_idxs, 0)]
         
-        for period_name, days in periods.items():
-            past_date = df.iloc[-1]['date'] - timedelta(days=days)
-            past_data = df[df['date'] <= past_date]
-            
-            if not past_data.empty:
-                past_price = past_data.iloc[-1]['Close']
-                period_return = ((latest_price - past_price) / past_price) * 100
-                
-                # Calculate CAGR for periods >= 1 year
+        period_returns = ((latest_price - past_prices) / past_prices) * 100
+        years = RETURN_PERIOD_DAYS / 365
+        cagrs = (((latest_price / past_prices) ** (1/years)) - 1) * 100
+        
+        for return_key, cagr_key, days, available, period_return, cagr in zip(
+                RETURN_KEYS, CAGR_KEYS, RETURN_PERIOD_DAYS, has_past, period_returns, cagrs):
+            if available:
+                # CAGR only for periods >= 1 year
                 if days >= 365:
-                    years = days / 365
-                    cagr = (((latest_price / past_price) ** (1/years)) - 1) * 100
-                    returns[f'cagr_{period_name}'] = round(cagr, 2)
-                
-                returns[f'return_{period_name}'] = round(period_return, 2)
+                    returns[cagr_key] = round(cagr, 2)
+                returns[return_key] = round(period_return, 2)
         
         return returns
     
@@ -170,23 +366,31 @@ class FinancialAnalyzer:
         if df.empty:
             return {}
         
-        df['daily_return'] = df['Close'].pct_change() * 100
+        # Plain arrays instead of pandas Series ops; missing NAVs are skipped, as pandas' reductions did
+        prices = df['Close'].to_numpy(dtype=np.float64)
+        prices = prices[~np.isnan(prices)]
+        if prices.size == 0:
+            return {}
+        daily_returns = np.diff(prices) / prices[:-1] * 100
         
         stats = {
-            'max_price': round(df['Close'].max(), 2),
-            'min_price': round(df['Close'].min(), 2),
-            'volatility': round(df['daily_return'].std() * (252 ** 0.5), 2),
+            'max_price': round(prices.max(), 2),
+            'min_price': round(prices.min(), 2),
+            'volatility': round(daily_returns.std(ddof=1) * (252 ** 0.5), 2) if daily_returns.size > 1 else np.nan,
         }
         
         # Max Drawdown
-        cumulative = (1 + df['daily_return']/100).cumprod()
-        running_max = cumulative.expanding().max()
-        drawdown = (cumulative - running_max) / running_max * 100
-        stats['max_drawdown'] = round(drawdown.min(), 2)
+        if daily_returns.size:
+            cumulative = np.cumprod(1 + daily_returns/100)
+            running_max = np.maximum.accumulate(cumulative)
+            drawdown = (cumulative - running_max) / running_max * 100
+            stats['max_drawdown'] = round(drawdown.min(), 2)
+        else:
+            stats['max_drawdown'] = np.nan
         
         # Sharpe Ratio
         risk_free_rate = 6.0
-        avg_return = df['daily_return'].mean() * 252
+        avg_return = daily_returns.mean() * 252 if daily_returns.size else np.nan
         if stats['volatility'] > 0:
             sharpe_ratio = (avg_return - risk_free_rate) / stats['volatility']
             stats['sharpe_ratio'] = round(sharpe_ratio, 2)
@@ -195,8 +399,48 @@ class FinancialAnalyzer:
         
         return stats
     
+    def load_instrument(self, instrument_type: str, instrument_identifier: str,
+                        prefetched: Optional[Dict] = None) -> Optional[Dict]:
+        """Load an instrument's name, metadata and history, with its amount-independent risk metrics"""
+        prefetched = prefetched or {'mf': {}, 'stock': {}}
+        
+        if instrument_type.lower() == 'mutual fund':
+            # Get MF data
+            meta = prefetched['mf'].get(instrument_identifier)
+            if meta is None:
+                meta = self.sync_mf_scheme(instrument_identifier)
+            if meta is None:
+                return None
+            
+            name = meta.get('scheme_name', 'Unknown')
+            metadata = meta
+            
+            df = self.get_mf_historical_data(instrument_identifier)
+            
+        else:  # Stock
+            stock_info = self.search_stock(instrument_identifier)
+            if not stock_info:
+                return None
+            
+            name = stock_info['name']
+            metadata = stock_info
+            
+            df = prefetched['stock'].get(stock_info['symbol'])
+            if df is None:
+                df = self.get_stock_historical_data(stock_info['symbol'])
+        
+        if df.empty:
+            return None
+        
+        return {
+            'name': name,
+            'metadata': metadata,
+            'history': df,
+            'risk_metrics': self.calculate_risk_metrics(df)
+        }
+    
     def analyze_instrument(self, instrument_type: str, instrument_identifier: str, 
-                          current_investment: float) -> Dict:
+                          current_investment: float, prefetched: Optional[Dict] = None) -> Dict:
         """Analyze single instrument and return complete metrics"""
         result = {
             'success': False,
@@ -208,33 +452,18 @@ class FinancialAnalyzer:
         }
         
         try:
-            if instrument_type.lower() == 'mutual fund':
-                # Get MF data
-                fund_details = self.get_mf_details(instrument_identifier)
-                if not fund_details:
-                    return result
-                
-                result['name'] = fund_details.get('meta', {}).get('scheme_name', 'Unknown')
-                result['metadata'] = fund_details.get('meta', {})
-                
-                df = self.get_mf_historical_data(instrument_identifier)
-                
-            else:  # Stock
-                stock_info = self.search_stock(instrument_identifier)
-                if not stock_info:
-                    return result
-                
-                result['name'] = stock_info['name']
-                result['metadata'] = stock_info
-                
-                df = self.get_stock_historical_data(stock_info['symbol'])
-            
-            if df.empty:
+            # Loading is memoized across reruns; only the amount-dependent returns are recomputed
+            try:
+                instrument = _load_instrument(self, instrument_type, instrument_identifier, prefetched)
+            except LookupError:
                 return result
             
+            result['name'] = instrument['name']
+            result['metadata'] = instrument['metadata']
+            
             # Calculate metrics
-            result['returns'] = self.calculate_returns(df, current_investment)
-            result['risk_metrics'] = self.calculate_risk_metrics(df)
+            result['returns'] = self.calculate_returns(instrument['history'], current_investment)
+            result['risk_metrics'] = instrument['risk_metrics']
             result['success'] = True
             
             return result
@@ -243,28 +472,58 @@ class FinancialAnalyzer:
             print(f"Error analyzing instrument: {e}")
             return result
     
+    def _analyze_one(self, investment: Dict, prefetched: Dict) -> Optional[Dict]:
+        """Analyze one investment record; None if it has no identifier"""
+        identifier = investment['scheme_code'] if investment['instrument_type'] == 'Mutual Fund' else investment['symbol']
+        
+        if pd.isna(identifier):
+            return None
+        
+        return self.analyze_instrument(
+            investment['instrument_type'],
+            identifier,
+            investment['current_investment'],
+            prefetched
+        )
+    
+    def _holdings_frame(self, portfolio_data: List[Dict]) -> pd.DataFrame:
+        """Columnar view of the analyzed instruments, one row each, in portfolio order"""
+        columns = {
+            'name': [analysis['name'] for analysis in portfolio_data],
+            'instrument_type': [analysis['instrument_type'] for analysis in portfolio_data]
+        }
+        for field in HOLDINGS_RETURN_FIELDS:
+            columns[field] = np.array([analysis['returns'].get(field, np.nan) for analysis in portfolio_data],
+                                      dtype=np.float64)
+        
+        return pd.DataFrame(columns)
+    
     def analyze_portfolio(self, investments_df: pd.DataFrame) -> Dict:
         """Analyze complete portfolio"""
-        total_invested = investments_df['current_investment'].sum()
-        total_current_value = 0
+        # Plain records with Python scalars: the per-row work below never touches pandas
+        investments = investments_df[['instrument_type', 'scheme_code', 'symbol', 'current_investment']].to_dict('records')
         
-        portfolio_data = []
+        total_invested = sum(investment['current_investment'] for investment in investments)
         
-        for _, investment in investments_df.iterrows():
-            identifier = investment['scheme_code'] if investment['instrument_type'] == 'Mutual Fund' else investment['symbol']
-            
-            if pd.isna(identifier):
-                continue
-            
-            analysis = self.analyze_instrument(
-                investment['instrument_type'],
-                identifier,
-                investment['current_investment']
-            )
-            
-            if analysis['success']:
-                total_current_value += analysis['returns'].get('current_value', 0)
-                portfolio_data.append(analysis)
+        is_mf = investments_df['instrument_type'] == 'Mutual Fund'
+        prefetched = self.prefetch_histories(
+            investments_df.loc[is_mf, 'scheme_code'].dropna().tolist(),
+            investments_df.loc[~is_mf, 'symbol'].dropna().tolist()
+        )
+        
+        # Stock validation and the analysis itself still block per instrument; overlap them too
+        analyses = []
+        if investments:
+            with ThreadPoolExecutor(max_workers=min(self.MAX_FETCH_WORKERS, len(investments))) as executor:
+                analyses = list(executor.map(lambda investment: self._analyze_one(investment, prefetched), investments))
+        
+        portfolio_data = [analysis for analysis in analyses if analysis and analysis['success']]
+        
+        current_values = np.fromiter(
+            (analysis['returns'].get('current_value', 0.0) for analysis in portfolio_data),
+            dtype=np.float64, count=len(portfolio_data)
+        )
+        total_current_value = float(current_values.sum())
         
         total_return = total_current_value - total_invested
         return_pct = (total_return / total_invested * 100) if total_invested > 0 else 0
@@ -275,5 +534,6 @@ class FinancialAnalyzer:
             'total_return': round(total_return, 2),
             'return_percentage': round(return_pct, 2),
             'num_investments': len(portfolio_data),
-            'instruments': portfolio_data
+            'instruments': portfolio_data,
+            'holdings': self._holdings_frame(portfolio_data)
         }
\ No newline at end of file
@@ -5,6 +5,69 @@ Portfolio Management and Report Generation
 from datetime import datetime
 from typing import Dict
 import pandas as pd
+from financial_analyzer import RETURN_KEYS, CAGR_KEYS, RETURN_PERIOD_LABELS
+
+RULE = '=' * 80
+DASH = '-' * 80
+
+# Report sections filled once per instrument with str.format_map
+INSTRUMENT_TEMPLATE = """
+{rule}
+INVESTMENT #{idx}: {name}
+{rule}
+
+INSTRUMENT INFORMATION
+{dash}
+Type                  : {instrument_type}
+{metadata_block}
+
+CURRENT HOLDINGS
+{dash}
+Current NAV/Price     : ₹{current_price:,.2f}
+Latest Date           : {latest_date}
+Units Held (Est.)     : {units:.2f}
+Invested Amount       : ₹{invested_amount:,.2f}
+Current Value (Est.)  : ₹{current_value:,.2f}
+
+PERFORMANCE RETURNS
+{dash}
+Note: Returns are based on historical instrument performance
+{period_block}
+RISK METRICS
+{dash}
+Annualized Volatility : {volatility}%
+Sharpe Ratio          : {sharpe_ratio}
+Max Drawdown          : {max_drawdown}%
+52-Week High          : ₹{max_price}
+52-Week Low           : ₹{min_price}
+
+RISK ASSESSMENT
+{dash}
+Risk Level            : {risk_level}
+Interpretation        : {risk_desc}
+"""
+
+MF_METADATA_TEMPLATE = """Scheme Code           : {scheme_code}
+Fund House            : {fund_house}
+Scheme Category       : {scheme_category}
+Scheme Type           : {scheme_type}"""
+
+STOCK_METADATA_TEMPLATE = """Symbol                : {symbol}
+Exchange              : {exchange}
+Sector                : {sector}
+Industry              : {industry}
+Market Cap            : {market_cap}"""
+
+# Summary column labels for the analysis' holdings view fields
+SUMMARY_COLUMNS = {
+    'name': 'Instrument',
+    'instrument_type': 'Type',
+    'invested_amount': 'Invested (₹)',
+    'current_value': 'Current Value (₹)',
+    'absolute_return': 'Returns (₹)',
+    'return_percentage': 'Returns (%)',
+    'current_price': 'Current Price'
+}
 
 class PortfolioManager:
     """Manage portfolio and generate reports"""
@@ -12,7 +75,9 @@ class PortfolioManager:
     def generate_client_report(self, user_details: Dict, portfolio_analysis: Dict) -> str:
         """Generate comprehensive client portfolio report"""
         
-        report = f"""
+        # Collect chunks and join once; repeated += on a growing str is quadratic
+        parts = []
+        parts.append(f"""
 {'='*80}
                     PORTFOLIO ANALYSIS REPORT
 {'='*80}
@@ -34,81 +99,39 @@ Return Percentage     : {portfolio_analysis['return_percentage']:.2f}%
 {'='*80}
 INDIVIDUAL INVESTMENTS
 {'='*80}
-"""
+""")
         
         for idx, instrument in enumerate(portfolio_analysis['instruments'], 1):
             returns = instrument.get('returns', {})
             risk = instrument.get('risk_metrics', {})
             metadata = instrument.get('metadata', {})
             
-            report += f"""
-{'='*80}
-INVESTMENT #{idx}: {instrument['name']}
-{'='*80}
-
-INSTRUMENT INFORMATION
-{'-'*80}
-Type                  : {instrument['instrument_type']}
-"""
-            
             # Add metadata based on instrument type
             if instrument['instrument_type'] == 'Mutual Fund':
-                report += f"""Scheme Code           : {metadata.get('scheme_code', 'N/A')}
-Fund House            : {metadata.get('fund_house', 'N/A')}
-Scheme Category       : {metadata.get('scheme_category', 'N/A')}
-Scheme Type           : {metadata.get('scheme_type', 'N/A')}"""
+                metadata_block = MF_METADATA_TEMPLATE.format_map({
+                    'scheme_code': metadata.get('scheme_code', 'N/A'),
+                    'fund_house': metadata.get('fund_house', 'N/A'),
+                    'scheme_category': metadata.get('scheme_category', 'N/A'),
+                    'scheme_type': metadata.get('scheme_type', 'N/A')
+                })
             else:  # Stock
                 mkt_cap = metadata.get('marketCap', 'N/A')
-                mkt_cap_str = f"₹{mkt_cap/10000000:,.0f} Cr" if isinstance(mkt_cap, (int, float)) else str(mkt_cap)
-                report += f"""Symbol                : {metadata.get('symbol', 'N/A')}
-Exchange              : {metadata.get('exchange', 'N/A')}
-Sector                : {metadata.get('sector', 'N/A')}
-Industry              : {metadata.get('industry', 'N/A')}
-Market Cap            : {mkt_cap_str}"""
-            
-            report += f"""
-
-CURRENT HOLDINGS
-{'-'*80}
-Current NAV/Price     : ₹{returns.get('current_price', 0):,.2f}
-Latest Date           : {returns.get('latest_date', 'N/A')}
-Units Held (Est.)     : {returns.get('units', 0):.2f}
-Invested Amount       : ₹{returns.get('invested_amount', 0):,.2f}
-Current Value (Est.)  : ₹{returns.get('current_value', 0):,.2f}
-
-PERFORMANCE RETURNS
-{'-'*80}
-Note: Returns are based on historical instrument performance
-"""
+                metadata_block = STOCK_METADATA_TEMPLATE.format_map({
+                    'symbol': metadata.get('symbol', 'N/A'),
+                    'exchange': metadata.get('exchange', 'N/A'),
+                    'sector': metadata.get('sector', 'N/A'),
+                    'industry': metadata.get('industry', 'N/A'),
+                    'market_cap': f"₹{mkt_cap/10000000:,.0f} Cr" if isinstance(mkt_cap, (int, float)) else str(mkt_cap)
+                })
             
             # Add period returns if available
-            period_returns = {
-                'return_1_month': '1 Month',
-                'return_3_months': '3 Months',
-                'return_6_months': '6 Months',
-                'return_1_year': '1 Year',
-                'return_3_years': '3 Years'
-            }
-            
-            for key, label in period_returns.items():
+            period_lines = []
+            for key, cagr_key, label in zip(RETURN_KEYS, CAGR_KEYS, RETURN_PERIOD_LABELS):
                 if key in returns:
-                    report += f"{label:<20}: {returns[key]:>8.2f}%"
-                    cagr_key = key.replace('return_', 'cagr_')
+                    line = f"{label:<20}: {returns[key]:>8.2f}%"
                     if cagr_key in returns:
-                        report += f"  (CAGR: {returns[cagr_key]:.2f}%)"
-                    report += "\n"
-            
-            report += f"""
-RISK METRICS
-{'-'*80}
-Annualized Volatility : {risk.get('volatility', 'N/A')}%
-Sharpe Ratio          : {risk.get('sharpe_ratio', 'N/A')}
-Max Drawdown          : {risk.get('max_drawdown', 'N/A')}%
-52-Week High          : ₹{risk.get('max_price', 'N/A')}
-52-Week Low           : ₹{risk.get('min_price', 'N/A')}
-
-RISK ASSESSMENT
-{'-'*80}"""
+                        line += f"  (CAGR: {returns[cagr_key]:.2f}%)"
+                    period_lines.append(line + "\n")
             
             volatility = risk.get('volatility', 0)
             if volatility < 10:
@@ -121,36 +144,39 @@ RISK ASSESSMENT
                 risk_level = "High Risk"
                 risk_desc = "This instrument shows high volatility, indicating significant fluctuations in returns."
             
-            report += f"""
-Risk Level            : {risk_level}
-Interpretation        : {risk_desc}
-"""
+            parts.append(INSTRUMENT_TEMPLATE.format_map({
+                'rule': RULE,
+                'dash': DASH,
+                'idx': idx,
+                'name': instrument['name'],
+                'instrument_type': instrument['instrument_type'],
+                'metadata_block': metadata_block,
+                'current_price': returns.get('current_price', 0),
+                'latest_date': returns.get('latest_date', 'N/A'),
+                'units': returns.get('units', 0),
+                'invested_amount': returns.get('invested_amount', 0),
+                'current_value': returns.get('current_value', 0),
+                'period_block': "".join(period_lines),
+                'volatility': risk.get('volatility', 'N/A'),
+                'sharpe_ratio': risk.get('sharpe_ratio', 'N/A'),
+                'max_drawdown': risk.get('max_drawdown', 'N/A'),
+                'max_price': risk.get('max_price', 'N/A'),
+                'min_price': risk.get('min_price', 'N/A'),
+                'risk_level': risk_level,
+                'risk_desc': risk_desc
+            }))
         
-        report += f"""
+        parts.append(f"""
 
 {'='*80}
 Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 {'='*80}
-"""
+""")
         
-        return report
+        return "".join(parts)
     
     def generate_investment_summary_df(self, portfolio_analysis: Dict) -> pd.DataFrame:
         """Generate DataFrame summary of all investments"""
-        
-        summary_data = []
-        
-        for instrument in portfolio_analysis['instruments']:
-            returns = instrument.get('returns', {})
-            
-            summary_data.append({
-                'Instrument': instrument['name'],
-                'Type': instrument['instrument_type'],
-                'Invested (₹)': returns.get('invested_amount', 0),
-                'Current Value (₹)': returns.get('current_value', 0),
-                'Returns (₹)': returns.get('absolute_return', 0),
-                'Returns (%)': returns.get('return_percentage', 0),
-                'Current Price': returns.get('current_price', 0)
-            })
-        
-        return pd.DataFrame(summary_data)
\ No newline at end of file
+        # A relabelling of the columnar holdings view; missing returns read as 0
+        summary_df = portfolio_analysis['holdings'][list(SUMMARY_COLUMNS)].rename(columns=SUMMARY_COLUMNS)
+        return summary_df.fillna(0)
\ No newline at end of file